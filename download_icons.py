@@ -1,13 +1,36 @@
+import hashlib
+import json
+import math
 import os
+import sys
 from PIL import Image, ImageDraw, ImageFilter, ImageFont
 
 # Define the app's blue color
 BLUE_COLOR = (34, 170, 253)  # #22AAFD in RGB
 
-def create_enhanced_icons():
-    # Ensure assets directory exists
-    assets_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
-    os.makedirs(assets_dir, exist_ok=True)
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+# Bump when the atlas/manifest layout changes
+ATLAS_VERSION = 1
+ATLAS_IMAGE = "icon_atlas.png"
+ATLAS_MANIFEST = "icon_atlas.json"
+
+# Sizes the GUI displays, pre-rendered for common display scaling factors
+# so CTkImage never has to resample at runtime
+DISPLAY_SIZES = (18, 40)
+SCALING_FACTORS = (1.0, 1.25, 1.5, 2.0)
+# The shipped PNGs are 100px, so the ICO stops below that instead of upscaling
+ICO_SIZES = [(16, 16), (24, 24), (32, 32), (48, 48), (64, 64), (96, 96)]
+
+# Icons packed into the atlas, read from assets/<name>.png
+ICON_NAMES = ("youtube_logo", "download_icon", "search_icon", "folder_icon")
+
+# Size of the single-icon PNGs written by --redraw
+PNG_SIZE = 100
+
+def render_icons():
+    """Draw every icon at full resolution"""
+    icons = {}
     
     # Create YouTube logo with blue theme
     size = 200  # Larger size for better quality icons
@@ -29,10 +52,7 @@ def create_enhanced_icons():
     # Apply some blur for a softer effect
     youtube_logo = youtube_logo.filter(ImageFilter.GaussianBlur(1))
     
-    # Save YouTube logo
-    youtube_logo = youtube_logo.resize((100, 100), Image.LANCZOS)
-    youtube_logo.save(os.path.join(assets_dir, "youtube_logo.png"))
-    print("Created enhanced youtube_logo.png")
+    icons["youtube_logo"] = youtube_logo
     
     # Create download icon with blue effect
     download_icon = Image.new('RGBA', (size, size), (255, 255, 255, 0))
@@ -66,10 +86,7 @@ def create_enhanced_icons():
     # Apply blur for a softer effect
     download_icon = download_icon.filter(ImageFilter.GaussianBlur(1))
     
-    # Save download icon
-    download_icon = download_icon.resize((100, 100), Image.LANCZOS)
-    download_icon.save(os.path.join(assets_dir, "download_icon.png"))
-    print("Created enhanced download_icon.png")
+    icons["download_icon"] = download_icon
     
     # Create search icon with blue accent
     search_icon = Image.new('RGBA', (size, size), (255, 255, 255, 0))
@@ -89,7 +106,6 @@ def create_enhanced_icons():
     # Draw the handle
     handle_length = glass_radius - 5
     handle_angle = 45  # degrees
-    import math
     end_x = glass_center[0] + (glass_radius + handle_length) * math.cos(math.radians(handle_angle))
     end_y = glass_center[1] + (glass_radius + handle_length) * math.sin(math.radians(handle_angle))
     
@@ -102,10 +118,7 @@ def create_enhanced_icons():
     # Apply blur for a softer effect
     search_icon = search_icon.filter(ImageFilter.GaussianBlur(1))
     
-    # Save search icon
-    search_icon = search_icon.resize((100, 100), Image.LANCZOS)
-    search_icon.save(os.path.join(assets_dir, "search_icon.png"))
-    print("Created enhanced search_icon.png")
+    icons["search_icon"] = search_icon
     
     # Create folder icon
     folder_icon = Image.new('RGBA', (size, size), (255, 255, 255, 0))
@@ -138,14 +151,110 @@ def create_enhanced_icons():
     # Composite the shadow and the folder
     folder_with_shadow = Image.alpha_composite(shadow, folder_icon)
     
-    # Save folder icon
-    folder_with_shadow = folder_with_shadow.resize((100, 100), Image.LANCZOS)
-    folder_with_shadow.save(os.path.join(assets_dir, "folder_icon.png"))
-    print("Created enhanced folder_icon.png")
+    icons["folder_icon"] = folder_with_shadow
+    
+    return icons
+
+def atlas_sizes():
+    """Every pixel size stored in the atlas"""
+    return sorted({round(size * factor) for size in DISPLAY_SIZES for factor in SCALING_FACTORS})
+
+def source_paths(assets_dir=ASSETS_DIR):
+    """The shipped icon PNGs the atlas and app icon are built from"""
+    return {name: os.path.join(assets_dir, f"{name}.png") for name in ICON_NAMES}
+
+def inputs_hash(assets_dir=ASSETS_DIR):
+    """Hash of everything the generated assets depend on"""
+    digest = hashlib.sha256()
+    for name, path in sorted(source_paths(assets_dir).items()):
+        digest.update(name.encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    digest.update(repr((ATLAS_VERSION, atlas_sizes(), ICO_SIZES)).encode())
+    return digest.hexdigest()
+
+def is_up_to_date(assets_dir=ASSETS_DIR):
+    """True if the atlas was built from the current inputs"""
+    try:
+        with open(os.path.join(assets_dir, ATLAS_MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        current_hash = inputs_hash(assets_dir)
+    except (OSError, ValueError):
+        return False
+    return (
+        manifest.get("version") == ATLAS_VERSION
+        and manifest.get("inputs_hash") == current_hash
+        and os.path.exists(os.path.join(assets_dir, manifest.get("image", ATLAS_IMAGE)))
+        and os.path.exists(os.path.join(assets_dir, "app_icon.ico"))
+    )
+
+def build_atlas(icons, assets_dir=ASSETS_DIR):
+    """Pack every icon at every atlas size into one sprite sheet plus a JSON manifest
+    
+    Each size gets a row; each icon a column. All resampling happens here, once.
+    """
+    names = sorted(icons)
+    sizes = atlas_sizes()
+    width = max(sizes) * len(names)
+    height = sum(sizes)
+    atlas = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    
+    rects = {name: {} for name in names}
+    y = 0
+    for size in sizes:
+        for column, name in enumerate(names):
+            x = column * max(sizes)
+            atlas.paste(icons[name].resize((size, size), Image.LANCZOS), (x, y))
+            rects[name][str(size)] = [x, y, size, size]
+        y += size
+    
+    # Write the image before the manifest so a manifest never points at a missing atlas
+    atlas.save(os.path.join(assets_dir, ATLAS_IMAGE), optimize=True)
+    manifest = {
+        "version": ATLAS_VERSION,
+        "inputs_hash": inputs_hash(assets_dir),
+        "image": ATLAS_IMAGE,
+        "icons": rects,
+    }
+    with open(os.path.join(assets_dir, ATLAS_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Created {ATLAS_IMAGE} ({len(names)} icons x {len(sizes)} sizes)")
+
+def build_icon_assets(force=False, assets_dir=ASSETS_DIR):
+    """Build the icon atlas and a multi-size app_icon.ico from the shipped PNGs
+    
+    Skipped when the PNGs and build settings hash to the value in the manifest.
+    """
+    if not force and is_up_to_date(assets_dir):
+        print("Icon atlas is up to date")
+        return False
+    
+    icons = {}
+    for name, path in source_paths(assets_dir).items():
+        with Image.open(path) as image:
+            icons[name] = image.convert('RGBA')
+    
+    # Multi-size app icon, each size downsampled from the logo
+    icons["youtube_logo"].save(os.path.join(assets_dir, "app_icon.ico"), sizes=ICO_SIZES)
+    print("Created app_icon.ico")
+    
+    build_atlas(icons, assets_dir)
+    return True
+
+def create_enhanced_icons():
+    """Redraw the flat blue icon set over the shipped PNGs
+    
+    This replaces the app's current artwork, so it only runs with --redraw.
+    """
+    # Ensure assets directory exists
+    os.makedirs(ASSETS_DIR, exist_ok=True)
     
-    # Save YouTube logo as app icon
-    youtube_logo.save(os.path.join(assets_dir, "app_icon.ico"))
-    print("Created enhanced app_icon.ico")
+    for name, icon in render_icons().items():
+        icon.resize((PNG_SIZE, PNG_SIZE), Image.LANCZOS).save(os.path.join(ASSETS_DIR, f"{name}.png"))
+        print(f"Created enhanced {name}.png")
 
 if __name__ == "__main__":
-    create_enhanced_icons() 
\ No newline at end of file
+    args = sys.argv[1:]
+    if "--redraw" in args:
+        create_enhanced_icons()
+    build_icon_assets(force="--force" in args or "--redraw" in args)
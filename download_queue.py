@@ -0,0 +1,99 @@
+from downloader import YouTubeDownloader
+
+# Scheduling policies, applied by the job stores when a worker claims a job
+FIFO = "FIFO"
+SHORTEST_FIRST = "Shortest First"
+FAIR_SHARE = "Fair Share"
+POLICIES = (FIFO, SHORTEST_FIRST, FAIR_SHARE)
+
+# Assumed throughput used to turn a file size into an expected download time
+DEFAULT_THROUGHPUT = 5 * 1024 * 1024  # bytes per second
+# Assumed bitrate for jobs whose metadata only has a duration
+DEFAULT_BITRATE = 4 * 1000 * 1000 // 8  # bytes per second of video
+# Expected time for jobs without any size information
+UNKNOWN_JOB_SECONDS = 60.0
+
+
+class DownloadJob:
+    """A queued download request"""
+    __slots__ = (
+        'job_id', 'url', 'quality', 'download_path', 'metadata',
+        'start_time', 'end_time', 'chapters',
+    )
+
+    def __init__(self, url, quality, download_path, metadata=None, job_id=None,
+                 start_time=None, end_time=None, chapters=None):
+        self.job_id = job_id
+        self.url = url
+        self.quality = quality
+        self.download_path = download_path
+        self.metadata = metadata
+        # Optional clip: seconds or "HH:MM:SS", and chapter titles/regexes
+        self.start_time = start_time
+        self.end_time = end_time
+        self.chapters = chapters
+
+    @property
+    def options(self):
+        """Extra keyword arguments for YouTubeDownloader.download_video"""
+        return {
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'chapters': self.chapters,
+        }
+
+    @property
+    def source(self):
+        """Channel (or uploader) the job belongs to, used for fair sharing"""
+        if self.metadata is not None:
+            return self.metadata.channel_id or self.metadata.author
+        return None
+
+    def expected_seconds(self, throughput=DEFAULT_THROUGHPUT):
+        """Estimate how long the job will take from its metadata"""
+        metadata = self.metadata
+        if metadata is None:
+            return UNKNOWN_JOB_SECONDS
+        if metadata.filesize:
+            size = metadata.filesize
+        elif metadata.length:
+            size = metadata.length * DEFAULT_BITRATE
+        else:
+            return UNKNOWN_JOB_SECONDS
+        if self.quality == "Audio Only" and metadata.length:
+            # Audio is a small fraction of the full download
+            size = min(size, metadata.length * 24000)
+        if metadata.length and (self.start_time is not None or self.end_time is not None):
+            # Clips only fetch the fragments covering their range
+            try:
+                start = 0 if self.start_time is None else YouTubeDownloader._parse_time(self.start_time)
+                end = metadata.length if self.end_time is None else YouTubeDownloader._parse_time(self.end_time)
+            except ValueError:
+                # Bad times fail at download; schedule the job as a full download meanwhile
+                start, end = 0, metadata.length
+            size *= max(min(end, metadata.length) - start, 0) / metadata.length
+        return size / throughput
+
+
+def scheduling_key(policy, aging, expected_seconds, created_at, last_served):
+    """Order of a queued job among jobs of equal priority under a policy
+
+    Lower keys run first and ties go to the oldest job.
+    - FIFO: jobs run in the order they were added.
+    - Shortest First: jobs with the smallest expected download time run first.
+      Waiting jobs age so large downloads are not starved: every second spent
+      in the queue takes `aging` seconds off a job's expected time.
+    - Fair Share: sources (channels) take turns, the one served longest ago
+      going next, so one channel with many queued videos cannot block the
+      others. last_served is when its source last had a job claimed.
+    """
+    if policy == SHORTEST_FIRST:
+        if expected_seconds is None:
+            expected_seconds = UNKNOWN_JOB_SECONDS
+        # Aging lowers every waiting job's key at the same rate, so
+        # expected - aging * (now - created_at) orders the same as
+        # expected + aging * created_at, which never changes once queued
+        return expected_seconds + aging * created_at
+    if policy == FAIR_SHARE:
+        return last_served or 0
+    return 0
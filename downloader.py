@@ -1,11 +1,120 @@
+import copy
 import os
 import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlparse
 import yt_dlp
+from retry_policy import DEFAULT_RETRY_POLICY, NON_RETRYABLE, RATE_LIMITED, HostUnavailable, classify_error
+
+# yt-dlp format selectors for each quality option
+QUALITY_FORMATS = {
+    "Highest": 'bestvideo+bestaudio/best',
+    "1080p": 'bestvideo[height<=1080]+bestaudio/best[height<=1080]',
+    "720p": 'bestvideo[height<=720]+bestaudio/best[height<=720]',
+    "480p": 'bestvideo[height<=480]+bestaudio/best[height<=480]',
+    "360p": 'bestvideo[height<=360]+bestaudio/best[height<=360]',
+    "Audio Only": 'bestaudio',
+}
+
+class VideoMetadata:
+    """Compact record of the video fields used for display and format selection"""
+    __slots__ = (
+        'video_id', 'url', 'title', 'author', 'channel_id', 'length',
+        'thumbnail', 'views', 'upload_date', 'filesize', 'heights', 'chapters',
+    )
+
+    def __init__(self, video_id=None, url=None, title='Unknown Title', author='Unknown Author',
+                 channel_id=None, length=0, thumbnail='', views=0, upload_date=None,
+                 filesize=None, heights=(), chapters=()):
+        self.video_id = video_id
+        self.url = url
+        self.title = title
+        # Channel names and IDs repeat across queued jobs, so share one copy of each
+        self.author = sys.intern(author) if author else author
+        self.channel_id = sys.intern(channel_id) if channel_id else channel_id
+        self.length = length
+        self.thumbnail = thumbnail
+        self.views = views
+        self.upload_date = upload_date
+        self.filesize = filesize
+        self.heights = heights
+        self.chapters = chapters
+
+    @classmethod
+    def from_info(cls, info):
+        """Build a record from a raw yt-dlp info dict, keeping only what we use"""
+        formats = info.get('formats') or ()
+        duration = info.get('duration') or 0
+        heights = tuple(sorted({f['height'] for f in formats if f.get('height')}))
+        chapters = tuple(
+            (c.get('start_time', 0), c.get('end_time', 0), c.get('title', ''))
+            for c in info.get('chapters') or ()
+        )
+        return cls(
+            video_id=info.get('id'),
+            url=info.get('webpage_url'),
+            title=info.get('title', 'Unknown Title'),
+            author=info.get('uploader', 'Unknown Author'),
+            channel_id=info.get('channel_id') or info.get('uploader_id'),
+            length=duration,
+            thumbnail=info.get('thumbnail', ''),
+            views=info.get('view_count', 0),
+            upload_date=info.get('upload_date'),
+            filesize=info.get('filesize') or info.get('filesize_approx') or cls._estimate_filesize(formats, duration),
+            heights=heights,
+            chapters=chapters,
+        )
+
+    @staticmethod
+    def _estimate_filesize(formats, duration):
+        """Estimate the size of the best video + best audio download in bytes"""
+        best_video = best_audio = 0
+        for f in formats:
+            size = f.get('filesize') or f.get('filesize_approx')
+            if not size and f.get('tbr') and duration:
+                # tbr is in kbit/s
+                size = int(f['tbr'] * 1000 / 8 * duration)
+            if not size:
+                continue
+            if f.get('vcodec', 'none') != 'none':
+                best_video = max(best_video, size)
+            elif f.get('acodec', 'none') != 'none':
+                best_audio = max(best_audio, size)
+        return (best_video + best_audio) or None
+
+    def height_for(self, quality):
+        """Height a quality option ("720p", "Highest") will download at
+
+        Returns None when no format fits, which makes the download fall back
+        to the best available format, or when the video's heights are unknown.
+        """
+        limit = int(quality[:-1]) if quality.endswith('p') else float('inf')
+        fitting = [h for h in self.heights if h <= limit]
+        return fitting[-1] if fitting else None
+
+    def matching_chapters(self, patterns):
+        """Titles of the chapters a chapter download would fetch (yt-dlp matches regexes)"""
+        return [title for _, _, title in self.chapters if any(re.search(p, title) for p in patterns)]
+
+    def to_dict(self):
+        """Return the fields shown by the GUI"""
+        return {
+            'title': self.title,
+            'author': self.author,
+            'length': self.length,
+            'thumbnail': self.thumbnail,
+            'views': self.views,
+        }
 
 class YouTubeDownloader:
-    def __init__(self, progress_callback=None, status_callback=None):
+    def __init__(self, progress_callback=None, status_callback=None, retry_policy=None):
         self.progress_callback = progress_callback
         self.status_callback = status_callback
+        self.retry_policy = retry_policy or DEFAULT_RETRY_POLICY
         self.current_video = None
         self.video_info = None
         # Add trackers to prevent duplicate messages
@@ -37,18 +146,10 @@ class YouTubeDownloader:
                     self._safe_status_update("Could not retrieve video information. The video might be private or region-restricted.")
                 return None
                 
-            self.video_info = info
-            
-            # Calculate duration in seconds
-            duration_seconds = info.get('duration', 0)
+            # Keep a compact record and let the raw info dict (formats, headers, thumbnails) be freed
+            self.video_info = VideoMetadata.from_info(info)
             
-            return {
-                'title': info.get('title', 'Unknown Title'),
-                'author': info.get('uploader', 'Unknown Author'),
-                'length': duration_seconds,
-                'thumbnail': info.get('thumbnail', ''),
-                'views': info.get('view_count', 0)
-            }
+            return self.video_info.to_dict()
         except Exception as e:
             if self.status_callback:
                 self._safe_status_update(f"Error fetching video info: {str(e)}")
@@ -71,13 +172,45 @@ class YouTubeDownloader:
             if self.status_callback:
                 self.status_callback(message)
     
+    def _progress_hook(self, d):
+        """yt-dlp progress hook: report progress and stop if cancelled"""
+        # Check if download was cancelled
+        if self.is_cancelled:
+            raise Exception("Download cancelled by user")
+            
+        if d['status'] == 'downloading':
+            if 'total_bytes' in d and d['total_bytes'] > 0:
+                percent = d['downloaded_bytes'] / d['total_bytes']
+                if self.progress_callback:
+                    self.progress_callback(percent)
+                
+                # Update status every 10% but prevent duplicates
+                percent_int = int(percent * 100)
+                if percent_int % 10 == 0 and percent_int > 0 and percent_int != self.last_percent_reported:
+                    self.last_percent_reported = percent_int
+                    self._safe_status_update(f"Downloaded {percent_int}%")
+            elif 'total_bytes_estimate' in d and d['total_bytes_estimate'] > 0:
+                percent = d['downloaded_bytes'] / d['total_bytes_estimate']
+                if self.progress_callback:
+                    self.progress_callback(percent)
+        
+        elif d['status'] == 'finished':
+            self._safe_status_update("Download finished, now processing...")
+            if self.progress_callback:
+                self.progress_callback(1.0)
+    
     def cancel_download(self):
         """Cancel the current download process"""
         self.is_cancelled = True
         self._safe_status_update("Download cancelled by user.")
     
-    def download_video(self, url, quality, download_path):
-        """Download the video with the specified quality"""
+    def download_video(self, url, quality, download_path, start_time=None, end_time=None, chapters=None):
+        """Download the video with the specified quality
+        
+        start_time/end_time (seconds or "HH:MM:SS") and chapters (chapter titles or
+        regexes) restrict the download to those sections of the video.
+        Returns None on failure; raises HostUnavailable if the host is throttling us.
+        """
         try:
             # Reset tracking variables at the start of a new download
             self.last_percent_reported = -1
@@ -90,124 +223,380 @@ class YouTubeDownloader:
             # Create the download path if it doesn't exist
             os.makedirs(download_path, exist_ok=True)
             
-            # Set up progress hook
-            def progress_hook(d):
-                # Check if download was cancelled
-                if self.is_cancelled:
-                    raise Exception("Download cancelled by user")
-                    
-                if d['status'] == 'downloading':
-                    if 'total_bytes' in d and d['total_bytes'] > 0:
-                        percent = d['downloaded_bytes'] / d['total_bytes']
-                        if self.progress_callback:
-                            self.progress_callback(percent)
-                        
-                        # Update status every 10% but prevent duplicates
-                        percent_int = int(percent * 100)
-                        if percent_int % 10 == 0 and percent_int > 0 and percent_int != self.last_percent_reported:
-                            self.last_percent_reported = percent_int
-                            self._safe_status_update(f"Downloaded {percent_int}%")
-                    elif 'total_bytes_estimate' in d and d['total_bytes_estimate'] > 0:
-                        percent = d['downloaded_bytes'] / d['total_bytes_estimate']
-                        if self.progress_callback:
-                            self.progress_callback(percent)
-                
-                elif d['status'] == 'finished':
-                    self._safe_status_update("Download finished, now processing...")
-                    if self.progress_callback:
-                        self.progress_callback(1.0)
+            # Work out which sections to fetch before touching the network
+            section_opts = self._section_options(download_path, start_time, end_time, chapters)
             
             # Configure yt-dlp options with more robust settings
             ydl_opts = {
                 'outtmpl': os.path.join(download_path, '%(title)s.%(ext)s'),
-                'progress_hooks': [progress_hook],
-                'ignoreerrors': True,
+                'progress_hooks': [self._progress_hook],
+                # Let errors reach us so the retry policy can classify them
+                'ignoreerrors': False,
                 'no_playlist': True,
                 'verbose': False,
                 'quiet': True,
                 'no_warnings': True,
-                'retries': 10,  # Retry up to 10 times
-                'fragment_retries': 10,
-                'skip_unavailable_fragments': True,
                 'geo_bypass': True,  # Try to bypass geo-restrictions
             }
+            ydl_opts.update(self._retry_options())
+            ydl_opts.update(section_opts)
             
             # Set format based on quality
+            if quality in QUALITY_FORMATS:
+                ydl_opts['format'] = QUALITY_FORMATS[quality]
             if quality == "Audio Only":
-                ydl_opts.update({
-                    'format': 'bestaudio',
-                    'postprocessors': [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192',
-                    }],
-                })
-            elif quality == "Highest":
-                ydl_opts.update({
-                    'format': 'bestvideo+bestaudio/best',
-                })
-            elif quality == "1080p":
-                ydl_opts.update({
-                    'format': 'bestvideo[height<=1080]+bestaudio/best[height<=1080]',
-                })
-            elif quality == "720p":
-                ydl_opts.update({
-                    'format': 'bestvideo[height<=720]+bestaudio/best[height<=720]',
-                })
-            elif quality == "480p":
-                ydl_opts.update({
-                    'format': 'bestvideo[height<=480]+bestaudio/best[height<=480]',
-                })
-            elif quality == "360p":
-                ydl_opts.update({
-                    'format': 'bestvideo[height<=360]+bestaudio/best[height<=360]',
-                })
+                ydl_opts['postprocessors'] = [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': 'mp3',
+                    'preferredquality': '192',
+                }]
             
             # Download the video
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                self._safe_status_update(f"Starting download with quality: {quality}")
-                
-                try:
-                    info = ydl.extract_info(url, download=True)
-                    
-                    if not info:
-                        raise Exception("Failed to extract video information")
-                    
-                    # Get the downloaded file path
-                    if 'requested_downloads' in info and info['requested_downloads']:
-                        filepath = info['requested_downloads'][0].get('filepath')
-                        if filepath:
-                            return filepath
-                    
-                    # Fallback to constructing the path
-                    title = info.get('title', 'video')
-                    ext = 'mp3' if quality == "Audio Only" else info.get('ext', 'mp4')
-                    return os.path.join(download_path, f"{title}.{ext}")
+            self._safe_status_update(f"Starting download with quality: {quality}")
+            try:
+                info = self._extract_with_retries(url, ydl_opts)
+            except yt_dlp.utils.DownloadError as e:
+                if "Requested format is not available" in str(e):
+                    self._safe_status_update("The requested quality is not available. Trying with best available format...")
                     
-                except yt_dlp.utils.DownloadError as e:
-                    if "Requested format is not available" in str(e):
-                        self._safe_status_update("The requested quality is not available. Trying with best available format...")
-                        
-                        # Try again with 'best' format
-                        return self._fallback_download(url, download_path)
-                    else:
-                        # Try fallback for other errors too
-                        self._safe_status_update(f"Download error: {str(e)}. Trying fallback method...")
-                        return self._fallback_download(url, download_path)
+                    # Try again with 'best' format
+                    return self._fallback_download(url, download_path, section_opts)
+                raise
             
+            if not info:
+                return None
+            
+            if section_opts:
+                return self._section_result(info)
+            
+            # Get the downloaded file path
+            if 'requested_downloads' in info and info['requested_downloads']:
+                filepath = info['requested_downloads'][0].get('filepath')
+                if filepath:
+                    return filepath
+            
+            # Fallback to constructing the path
+            title = info.get('title', 'video')
+            ext = 'mp3' if quality == "Audio Only" else info.get('ext', 'mp4')
+            return os.path.join(download_path, f"{title}.{ext}")
+            
+        except HostUnavailable:
+            # Not the video's fault; let the caller decide when to try again
+            raise
         except Exception as e:
-            self._safe_status_update(f"Error during download: {str(e)}")
-            self._safe_status_update("Attempting fallback download method...")
+            if not self.is_cancelled:
+                self._safe_status_update(f"Error during download: {str(e)}")
+            return None
+    
+    def download_variants(self, url, download_path, variants, subtitle_langs=None):
+        """Produce several outputs of one video from a single extraction
+        
+        variants is a list of quality names from QUALITY_FORMATS plus "Thumbnail"
+        and "Subtitles". Every stream needed by any variant is downloaded once,
+        then all outputs are built from the local copies in one ffmpeg run.
+        Returns {variant: filepath}, with one "Subtitles (<lang>)" entry per language.
+        Like download_video, raises HostUnavailable if the host is throttling us.
+        """
+        work_dir = None
+        try:
+            self.last_percent_reported = -1
+            self.last_status_message = ""
+            self.is_cancelled = False
             
-            # Try fallback download for any error
-            try:
-                return self._fallback_download(url, download_path)
-            except Exception as fallback_error:
-                self._safe_status_update(f"Fallback download failed: {str(fallback_error)}")
+            url = self._clean_url(url)
+            os.makedirs(download_path, exist_ok=True)
+            
+            base_opts = {
+                'ignoreerrors': False,
+                'no_playlist': True,
+                'quiet': True,
+                'no_warnings': True,
+                'geo_bypass': True,
+            }
+            base_opts.update(self._retry_options())
+            
+            # One extraction shared by every variant
+            self._safe_status_update("Fetching video information...")
+            ie_result = self._extract_with_retries(url, base_opts, download=False, process=False)
+            if not ie_result:
+                return None
+            
+            # Resolve each quality to the format IDs it needs, without downloading
+            plans = {}
+            for variant in variants:
+                if variant not in QUALITY_FORMATS:
+                    continue
+                format_ids = self._plan_variant(base_opts, ie_result, QUALITY_FORMATS[variant])
+                if format_ids is None:
+                    self._safe_status_update(f"{variant} is not available. Trying with best available format...")
+                    format_ids = self._plan_variant(base_opts, ie_result, 'best')
+                if format_ids is None:
+                    self._safe_status_update(f"Skipping {variant}: no suitable format available")
+                    continue
+                plans[variant] = format_ids
+            
+            # Overlapping streams (e.g. the audio shared by 1080p and Audio Only) are fetched once
+            format_ids = list(dict.fromkeys(fid for fids in plans.values() for fid in fids))
+            title = yt_dlp.utils.sanitize_filename(ie_result.get('title') or 'video')
+            work_dir = tempfile.mkdtemp(prefix='.variants-', dir=download_path)
             
+            ydl_opts = dict(base_opts)
+            ydl_opts.update({
+                'progress_hooks': [self._progress_hook],
+                'outtmpl': {
+                    'default': os.path.join(work_dir, '%(id)s.f%(format_id)s.%(ext)s'),
+                    'thumbnail': os.path.join(download_path, f'{title}.%(ext)s'),
+                    'subtitle': os.path.join(download_path, f'{title}.%(ext)s'),
+                },
+                'writethumbnail': "Thumbnail" in variants,
+                'writesubtitles': "Subtitles" in variants,
+                'subtitleslangs': subtitle_langs or ['en'],
+            })
+            if format_ids:
+                # A comma-separated selector downloads each format as its own file
+                ydl_opts['format'] = ','.join(format_ids)
+            else:
+                ydl_opts['skip_download'] = True
+            
+            self._safe_status_update(f"Downloading {len(format_ids)} stream(s) for {len(variants)} output(s)...")
+            info = self._extract_with_retries(url, ydl_opts, ie_result=ie_result)
+            if not info:
+                return None
+            
+            local_files = {}
+            for download in info.get('requested_downloads') or [info]:
+                if download.get('filepath'):
+                    local_files[download['format_id']] = download['filepath']
+            
+            outputs = self._build_variant_outputs(plans, local_files, download_path, title)
+            
+            if "Thumbnail" in variants:
+                written = [t['filepath'] for t in info.get('thumbnails') or [] if t.get('filepath')]
+                if written:
+                    outputs["Thumbnail"] = written[-1]
+            if "Subtitles" in variants:
+                for lang, subtitle in (info.get('requested_subtitles') or {}).items():
+                    if subtitle.get('filepath'):
+                        outputs[f"Subtitles ({lang})"] = subtitle['filepath']
+            return outputs
+        
+        except HostUnavailable:
+            # Not the video's fault; let the caller decide when to try again
+            raise
+        except Exception as e:
+            if not self.is_cancelled:
+                self._safe_status_update(f"Error during download: {str(e)}")
             return None
+        finally:
+            if work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    
+    def _plan_variant(self, base_opts, ie_result, format_selector):
+        """Return the format IDs a selector picks, or None if nothing matches"""
+        # The format selector is fixed when YoutubeDL is created, so use one per variant
+        try:
+            with yt_dlp.YoutubeDL({**base_opts, 'format': format_selector, 'simulate': True}) as ydl:
+                info = ydl.process_ie_result(copy.deepcopy(ie_result), download=False)
+        except yt_dlp.utils.YoutubeDLError as e:
+            if "Requested format is not available" in str(e):
+                return None
+            raise
+        return [f['format_id'] for f in info.get('requested_formats') or [info]]
+    
+    def _build_variant_outputs(self, plans, local_files, download_path, title):
+        """Mux/convert every planned output from the downloaded streams in one ffmpeg pass"""
+        if not plans:
+            return {}
+        ffmpeg = shutil.which('ffmpeg')
+        if not ffmpeg:
+            raise Exception("FFmpeg is required to build the requested outputs")
+        
+        # Each local stream is an ffmpeg input exactly once
+        inputs = list(dict.fromkeys(local_files[fid] for fids in plans.values() for fid in fids))
+        index = {path: i for i, path in enumerate(inputs)}
+        command = [ffmpeg, '-y', '-loglevel', 'error']
+        for path in inputs:
+            command += ['-i', path]
+        
+        outputs = {}
+        for variant, fids in plans.items():
+            paths = [local_files[fid] for fid in fids]
+            if variant == "Audio Only":
+                target = os.path.join(download_path, f"{title}.mp3")
+                command += ['-map', f'{index[paths[-1]]}:a:0', '-vn',
+                            '-c:a', 'libmp3lame', '-b:a', '192k', target]
+            elif len(paths) == 2:
+                video_path, audio_path = paths
+                exts = {os.path.splitext(p)[1].lower() for p in paths}
+                ext = 'mp4' if exts <= {'.mp4', '.m4a'} else 'webm' if exts == {'.webm'} else 'mkv'
+                target = os.path.join(download_path, f"{title} [{variant}].{ext}")
+                # Stream copy: merging never re-encodes
+                command += ['-map', f'{index[video_path]}:v:0', '-map', f'{index[audio_path]}:a:0',
+                            '-c', 'copy', target]
+            else:
+                ext = os.path.splitext(paths[0])[1]
+                target = os.path.join(download_path, f"{title} [{variant}]{ext}")
+                command += ['-map', str(index[paths[0]]), '-c', 'copy', target]
+            outputs[variant] = target
+        
+        self._safe_status_update("Download finished, now processing...")
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"FFmpeg failed: {result.stderr.strip()}")
+        return outputs
+    
+    def _section_options(self, download_path, start_time=None, end_time=None, chapters=None):
+        """yt-dlp options that fetch only the requested time range and/or chapters
+        
+        yt-dlp hands sections to ffmpeg, which seeks inside the stream so only the
+        fragments/byte ranges covering each section are downloaded, then cuts with
+        a stream copy at the nearest keyframes.
+        """
+        if start_time is None and end_time is None and not chapters:
+            return {}
+        
+        ranges = []
+        if start_time is not None or end_time is not None:
+            start = self._parse_time(start_time) if start_time is not None else 0
+            end = self._parse_time(end_time) if end_time is not None else float('inf')
+            if end <= start:
+                raise ValueError("End time must be after start time")
+            ranges.append((start, end))
+        
+        return {
+            'download_ranges': yt_dlp.utils.download_range_func(chapters or None, ranges),
+            # Keep cuts at keyframes so the section can be stream-copied instead of re-encoded
+            'force_keyframes_at_cuts': False,
+            # One file per section, named after the chapter or the start offset
+            'outtmpl': os.path.join(download_path, '%(title)s - %(section_title,section_start)s.%(ext)s'),
+        }
+    
+    def _section_result(self, info):
+        """Return the first file written by a section download, reporting all of them"""
+        paths = [d['filepath'] for d in info.get('requested_downloads') or [] if d.get('filepath')]
+        if not paths:
+            # yt-dlp downloads nothing when no chapter matches or the range is past the end
+            raise Exception("No matching chapter or time range found in the video")
+        if len(paths) > 1:
+            self._safe_status_update(f"Saved {len(paths)} sections:\n" + "\n".join(paths))
+        return paths[0]
     
-    def _fallback_download(self, url, download_path):
+    @staticmethod
+    def _parse_time(value):
+        """Convert seconds or a "HH:MM:SS" string to seconds"""
+        if isinstance(value, (int, float)):
+            return float(value)
+        seconds = yt_dlp.utils.parse_duration(str(value).strip())
+        if seconds is None:
+            raise ValueError(f"Invalid time: {value}")
+        return seconds
+    
+    def _retry_options(self):
+        """yt-dlp retry settings
+        
+        HTTP and extractor errors are not retried inside yt-dlp, so every one of
+        them reaches _extract_with_retries, the classifier and the host breaker.
+        Partial files are resumed on the next attempt. Single fragments get quick
+        in-place retries, since losing one would restart a stream; a fragment that
+        still fails aborts the attempt rather than leaving a gap in the file.
+        """
+        policy = self.retry_policy
+        return {
+            'retries': 0,
+            'extractor_retries': 0,
+            'fragment_retries': policy.fragment_retries,
+            'skip_unavailable_fragments': False,
+            'continuedl': True,
+            'retry_sleep_functions': {
+                'fragment': policy.sleep_function,
+            },
+        }
+    
+    def _sleep(self, seconds):
+        """Sleep unless the download is cancelled; returns False if it was"""
+        deadline = time.monotonic() + seconds
+        while not self.is_cancelled:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, 0.5))
+        return False
+    
+    def _extract_with_retries(self, url, ydl_opts, download=True, process=True, ie_result=None):
+        """Run a yt-dlp download, retrying only errors the retry policy says are worth it
+        
+        When ie_result is given it is processed (format selection + download) instead
+        of extracting url again. Raises HostUnavailable when the host's breaker or
+        Retry-After asks for a longer wait than the policy's max_delay.
+        """
+        policy = self.retry_policy
+        host = urlparse(url).hostname or url
+        breaker = policy.breaker_for(host)
+        attempt = 0
+        
+        while True:
+            wait = breaker.time_until_allowed()
+            if wait > policy.max_delay:
+                message = f"Too many recent failures from {host}. Try again in {int(wait)} seconds."
+                self._safe_status_update(message)
+                raise HostUnavailable(message, wait)
+            if wait:
+                self._safe_status_update(f"Waiting {wait:.0f}s before contacting {host} again...")
+                if not self._sleep(wait):
+                    return None
+            
+            # Set once the breaker has been told how this attempt went
+            settled = False
+            try:
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    if ie_result is not None:
+                        # process_ie_result fills in the dict, so keep the caller's copy untouched
+                        info = ydl.process_ie_result(copy.deepcopy(ie_result), download=download)
+                    else:
+                        info = ydl.extract_info(url, download=download, process=process)
+                if not info:
+                    raise Exception("Failed to extract video information")
+                breaker.record_success()
+                settled = True
+                return info
+            except Exception as e:
+                if self.is_cancelled:
+                    return None
+                
+                error = classify_error(e)
+                if error.kind == NON_RETRYABLE:
+                    if error.status is not None:
+                        # The host answered; it's the request that's wrong
+                        breaker.record_success()
+                        settled = True
+                    raise
+                
+                if error.host_error:
+                    breaker.record_failure(error.retry_after, rate_limited=error.kind == RATE_LIMITED)
+                    settled = True
+                
+                attempt += 1
+                if attempt >= policy.max_attempts:
+                    raise
+                
+                delay = policy.delay(attempt, error.retry_after)
+                if delay > policy.max_delay:
+                    message = f"{host} asked us to wait {int(delay)} seconds. Try again later."
+                    self._safe_status_update(message)
+                    raise HostUnavailable(message, delay) from e
+                reason = "Rate limited" if error.kind == RATE_LIMITED else f"Download error: {str(e)}"
+            finally:
+                if not settled:
+                    # Cancelled, or an error that says nothing about the host:
+                    # give back the half-open trial slot so other jobs aren't stuck behind it
+                    breaker.release()
+            
+            # Back off outside the try so the trial slot is never held while sleeping
+            self._safe_status_update(f"{reason}. Retrying in {delay:.0f}s (attempt {attempt + 1}/{policy.max_attempts})...")
+            if not self._sleep(delay):
+                return None
+    
+    def _fallback_download(self, url, download_path, section_opts=None):
         """Fallback download with most basic settings"""
         try:
             # Check if already cancelled
@@ -217,64 +606,43 @@ class YouTubeDownloader:
             # Reset tracking variables
             self.last_percent_reported = -1
             
-            # Set up progress hook
-            def progress_hook(d):
-                # Check if download was cancelled
-                if self.is_cancelled:
-                    raise Exception("Download cancelled by user")
-                    
-                if d['status'] == 'downloading':
-                    if 'total_bytes' in d and d['total_bytes'] > 0:
-                        percent = d['downloaded_bytes'] / d['total_bytes']
-                        if self.progress_callback:
-                            self.progress_callback(percent)
-                            
-                        # Only show progress updates at 10% intervals and avoid duplicates
-                        percent_int = int(percent * 100)
-                        if percent_int % 10 == 0 and percent_int > 0 and percent_int != self.last_percent_reported:
-                            self.last_percent_reported = percent_int
-                            self._safe_status_update(f"Downloaded {percent_int}%")
-                    elif 'total_bytes_estimate' in d and d['total_bytes_estimate'] > 0:
-                        percent = d['downloaded_bytes'] / d['total_bytes_estimate']
-                        if self.progress_callback:
-                            self.progress_callback(percent)
-                
-                elif d['status'] == 'finished':
-                    self._safe_status_update("Download finished, now processing...")
-                    if self.progress_callback:
-                        self.progress_callback(1.0)
-            
             # Use the most basic settings possible
             ydl_opts = {
                 'format': 'best',
                 'outtmpl': os.path.join(download_path, '%(title)s.%(ext)s'),
-                'progress_hooks': [progress_hook],
-                'ignoreerrors': True,
+                'progress_hooks': [self._progress_hook],
+                'ignoreerrors': False,
                 'no_playlist': True,
-                'retries': 10,
+                'quiet': True,
+                'no_warnings': True,
                 'geo_bypass': True,
             }
+            ydl_opts.update(self._retry_options())
+            ydl_opts.update(section_opts or {})
             
             self._safe_status_update("Attempting fallback download with basic settings...")
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                
-                if not info:
-                    self._safe_status_update("Fallback download failed: Could not extract video information")
-                    return None
-                
-                # Get the downloaded file path
-                if 'requested_downloads' in info and info['requested_downloads']:
-                    filepath = info['requested_downloads'][0].get('filepath')
-                    if filepath:
-                        return filepath
-                
-                # Fallback to constructing the path
-                title = info.get('title', 'video')
-                ext = info.get('ext', 'mp4')
-                return os.path.join(download_path, f"{title}.{ext}")
+            info = self._extract_with_retries(url, ydl_opts)
+            if not info:
+                return None
+            
+            if section_opts:
+                return self._section_result(info)
+            
+            # Get the downloaded file path
+            if 'requested_downloads' in info and info['requested_downloads']:
+                filepath = info['requested_downloads'][0].get('filepath')
+                if filepath:
+                    return filepath
+            
+            # Fallback to constructing the path
+            title = info.get('title', 'video')
+            ext = info.get('ext', 'mp4')
+            return os.path.join(download_path, f"{title}.{ext}")
                 
+        except HostUnavailable:
+            raise
         except Exception as e:
-            self._safe_status_update(f"Fallback download failed: {str(e)}")
-            return None
\ No newline at end of file
+            if not self.is_cancelled:
+                self._safe_status_update(f"Fallback download failed: {str(e)}")
+            return None
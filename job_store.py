@@ -0,0 +1,314 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from download_queue import FIFO, FAIR_SHARE, POLICIES, scheduling_key
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class StoredJob:
+    """A job claimed from a job store"""
+    __slots__ = ('job_id', 'url', 'quality', 'download_path', 'attempts', 'options')
+
+    def __init__(self, job_id, url, quality, download_path, attempts=0, options=None):
+        self.job_id = job_id
+        self.url = url
+        self.quality = quality
+        self.download_path = download_path
+        self.attempts = attempts
+        # Extra keyword arguments for download_video (clip range, chapters)
+        self.options = options or {}
+
+
+def _check_policy(policy):
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown scheduling policy: {policy}")
+
+
+class MemoryJobStore:
+    """In-process job store with the same lease semantics as SQLiteJobStore
+
+    Useful for running several worker threads on one machine, and as a local
+    stand-in when no shared volume is available.
+    """
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS, policy=FIFO, aging=1.0):
+        _check_policy(policy)
+        self.max_attempts = max_attempts
+        self.policy = policy
+        self.aging = aging
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._next_id = 1
+
+    def add(self, url, quality, download_path, priority=0, options=None, expected_seconds=None, source=None):
+        """Queue a job and return its ID; lower priority values run first"""
+        with self._lock:
+            job_id = self._next_id
+            self._next_id += 1
+            self._jobs[job_id] = {
+                'url': url, 'quality': quality, 'download_path': download_path,
+                'options': dict(options or {}), 'priority': priority, 'status': QUEUED, 'worker_id': None,
+                'lease_expires': 0, 'attempts': 0, 'result': None, 'error': None,
+                'expected_seconds': expected_seconds, 'source': source,
+                'created_at': time.time(), 'claimed_at': None,
+            }
+            return job_id
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Lease the next runnable job to a worker, or return None"""
+        now = time.time()
+        with self._lock:
+            self._expire_leases(now)
+            runnable = [job_id for job_id, j in self._jobs.items() if j['status'] == QUEUED]
+            if not runnable:
+                return None
+            job_id = min(runnable, key=self._sort_key())
+            job = self._jobs[job_id]
+            job.update(status=RUNNING, worker_id=worker_id, lease_expires=now + lease_seconds, claimed_at=now)
+            job['attempts'] += 1
+            return StoredJob(job_id, job['url'], job['quality'], job['download_path'], job['attempts'], dict(job['options']))
+
+    def _sort_key(self):
+        last_served = {}
+        for job in self._jobs.values():
+            if job['claimed_at'] is not None:
+                last_served[job['source']] = max(last_served.get(job['source'], 0), job['claimed_at'])
+
+        def key(job_id):
+            job = self._jobs[job_id]
+            return (
+                job['priority'],
+                scheduling_key(self.policy, self.aging, job['expected_seconds'], job['created_at'],
+                               last_served.get(job['source'])),
+                job_id,
+            )
+        return key
+
+    def heartbeat(self, job_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extend a lease; returns False if the worker no longer holds it"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job['status'] != RUNNING or job['worker_id'] != worker_id:
+                return False
+            job['lease_expires'] = time.time() + lease_seconds
+            return True
+
+    def complete(self, job_id, worker_id, result):
+        return self._finish(job_id, worker_id, DONE, result=result)
+
+    def fail(self, job_id, worker_id, error):
+        return self._finish(job_id, worker_id, FAILED, error=error)
+
+    def release(self, job_id, worker_id):
+        """Put a claimed job back in the queue without counting the attempt"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job['status'] != RUNNING or job['worker_id'] != worker_id:
+                return False
+            job.update(status=QUEUED, worker_id=None, lease_expires=0)
+            job['attempts'] -= 1
+            return True
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job['status'] if job else None
+
+    def _finish(self, job_id, worker_id, status, result=None, error=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job['status'] != RUNNING or job['worker_id'] != worker_id:
+                return False
+            job.update(status=status, result=result, error=error, worker_id=None)
+            return True
+
+    def _expire_leases(self, now):
+        for job in self._jobs.values():
+            if job['status'] == RUNNING and job['lease_expires'] < now:
+                # The worker died or stalled; hand the job to someone else
+                job['status'] = QUEUED if job['attempts'] < self.max_attempts else FAILED
+                job['worker_id'] = None
+                if job['status'] == FAILED:
+                    job['error'] = "Lease expired too many times"
+
+
+class SQLiteJobStore:
+    """Job store backed by a SQLite database, shareable between processes and hosts
+
+    Jobs are claimed with a lease that the worker must renew through
+    heartbeat(). If a worker dies its lease runs out and the job becomes
+    claimable again. Lease times use wall-clock time, so hosts sharing the
+    database need reasonably synchronised clocks.
+
+    Among jobs of equal priority, the claiming worker's policy picks the next
+    one; see download_queue.scheduling_key.
+    """
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS, timeout=30, policy=FIFO, aging=1.0):
+        _check_policy(policy)
+        self.path = path
+        self.policy = policy
+        self.aging = aging
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    quality TEXT NOT NULL,
+                    download_path TEXT NOT NULL,
+                    options TEXT,
+                    priority REAL NOT NULL DEFAULT 0,
+                    expected_seconds REAL,
+                    source TEXT,
+                    claimed_at REAL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    worker_id TEXT,
+                    lease_expires REAL NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            # Bring databases created by older versions up to date
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (('options', 'TEXT'), ('expected_seconds', 'REAL'),
+                                        ('source', 'TEXT'), ('claimed_at', 'REAL')):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs (status, priority, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_source_claims ON jobs (source, claimed_at)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # A fresh connection per call keeps the store safe to share between threads.
+        # isolation_level=None lets us issue BEGIN IMMEDIATE ourselves.
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        # Claims are ordered by the same policy code MemoryJobStore uses
+        conn.create_function(
+            "scheduling_key", 3,
+            lambda expected, created_at, last_served: scheduling_key(
+                self.policy, self.aging, expected, created_at, last_served),
+            deterministic=True,
+        )
+        return conn
+
+    def add(self, url, quality, download_path, priority=0, options=None, expected_seconds=None, source=None):
+        """Queue a job and return its ID; lower priority values run first"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "INSERT INTO jobs (url, quality, download_path, options, priority, expected_seconds, source, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, quality, download_path, json.dumps(options) if options else None, priority,
+                 expected_seconds, source, time.time())
+            )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def _order_by(self):
+        """ORDER BY clause for the store's policy (see download_queue.scheduling_key)"""
+        last_served = "NULL"
+        if self.policy == FAIR_SHARE:
+            last_served = "(SELECT MAX(served.claimed_at) FROM jobs AS served WHERE served.source IS jobs.source)"
+        return f"priority, scheduling_key(expected_seconds, created_at, {last_served}), id"
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Lease the next runnable job to a worker, or return None"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            # Take the write lock up front so two workers can't claim the same row
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, worker_id = NULL, "
+                "error = CASE WHEN attempts < ? THEN error ELSE 'Lease expired too many times' END "
+                "WHERE status = ? AND lease_expires < ?",
+                (self.max_attempts, QUEUED, FAILED, self.max_attempts, RUNNING, now)
+            )
+            row = conn.execute(
+                "SELECT id, url, quality, download_path, attempts, options FROM jobs "
+                f"WHERE status = ? ORDER BY {self._order_by()} LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, lease_expires = ?, claimed_at = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, worker_id, now + lease_seconds, now, row[0])
+            )
+            conn.execute("COMMIT")
+            return StoredJob(row[0], row[1], row[2], row[3], row[4] + 1, json.loads(row[5]) if row[5] else None)
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extend a lease; returns False if the worker no longer holds it"""
+        return self._update_owned(
+            job_id, worker_id, "lease_expires = ?", (time.time() + lease_seconds,)
+        )
+
+    def complete(self, job_id, worker_id, result):
+        return self._update_owned(
+            job_id, worker_id, "status = ?, result = ?, worker_id = NULL", (DONE, result)
+        )
+
+    def fail(self, job_id, worker_id, error):
+        return self._update_owned(
+            job_id, worker_id, "status = ?, error = ?, worker_id = NULL", (FAILED, error)
+        )
+
+    def release(self, job_id, worker_id):
+        """Put a claimed job back in the queue without counting the attempt"""
+        return self._update_owned(
+            job_id, worker_id, "status = ?, worker_id = NULL, lease_expires = 0, attempts = attempts - 1", (QUEUED,)
+        )
+
+    def status(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def _update_owned(self, job_id, worker_id, assignments, params):
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND worker_id = ? AND status = ?",
+                (*params, job_id, worker_id, RUNNING)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+
+def new_worker_id():
+    """Build a worker ID that is unique across hosts"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
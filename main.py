@@ -1,3 +1,4 @@
+import json
 import os
 import threading
 import tkinter as tk
@@ -83,37 +84,57 @@ class App(ctk.CTk):
                 except Exception as e:
                     print(f"Failed to download asset {filename}: {e}")
 
+    def load_icon_atlas(self, assets_dir):
+        """Decode the icon atlas once and return a function that crops icons from it
+        
+        The atlas is built by download_icons.py; the GUI only reads it.
+        """
+        with open(os.path.join(assets_dir, "icon_atlas.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        atlas = Image.open(os.path.join(assets_dir, manifest["image"]))
+        atlas.load()
+        
+        # Pick the pre-rendered size matching the display scaling, so CTkImage
+        # gets an image that is already the size it will draw
+        scaling = self._get_window_scaling()
+        
+        def icon(name, size):
+            rects = manifest["icons"][name]
+            wanted = round(size * scaling)
+            available = sorted(int(s) for s in rects)
+            best = next((s for s in available if s >= wanted), available[-1])
+            x, y, w, h = rects[str(best)]
+            image = atlas.crop((x, y, x + w, y + h))
+            # The same image serves both appearance modes
+            return ctk.CTkImage(light_image=image, dark_image=image, size=(size, size))
+        
+        return icon
+
+    def load_icon_image(self, assets_dir, filename, size):
+        """Load a single icon PNG (used when the atlas is unavailable)"""
+        image = Image.open(os.path.join(assets_dir, filename))
+        return ctk.CTkImage(light_image=image, dark_image=image, size=(size, size))
+
     def create_widgets(self):
         # Load images
         assets_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
         
         try:
-            self.youtube_logo = ctk.CTkImage(
-                light_image=Image.open(os.path.join(assets_dir, "youtube_logo.png")), 
-                dark_image=Image.open(os.path.join(assets_dir, "youtube_logo.png")),
-                size=(40, 40)
-            )
-            
-            self.download_icon = ctk.CTkImage(
-                light_image=Image.open(os.path.join(assets_dir, "download_icon.png")), 
-                dark_image=Image.open(os.path.join(assets_dir, "download_icon.png")),
-                size=(18, 18)
-            )
-            
-            self.search_icon = ctk.CTkImage(
-                light_image=Image.open(os.path.join(assets_dir, "search_icon.png")), 
-                dark_image=Image.open(os.path.join(assets_dir, "search_icon.png")),
-                size=(18, 18)
-            )
-            
-            self.folder_icon = ctk.CTkImage(
-                light_image=Image.open(os.path.join(assets_dir, "folder_icon.png")), 
-                dark_image=Image.open(os.path.join(assets_dir, "folder_icon.png")),
-                size=(18, 18)
-            )
+            icon = self.load_icon_atlas(assets_dir)
+            self.youtube_logo = icon("youtube_logo", 40)
+            self.download_icon = icon("download_icon", 18)
+            self.search_icon = icon("search_icon", 18)
+            self.folder_icon = icon("folder_icon", 18)
         except Exception as e:
-            print(f"Failed to load images: {e}")
-            self.youtube_logo = self.download_icon = self.search_icon = self.folder_icon = None
+            print(f"Failed to load icon atlas, using individual images: {e}")
+            try:
+                self.youtube_logo = self.load_icon_image(assets_dir, "youtube_logo.png", 40)
+                self.download_icon = self.load_icon_image(assets_dir, "download_icon.png", 18)
+                self.search_icon = self.load_icon_image(assets_dir, "search_icon.png", 18)
+                self.folder_icon = self.load_icon_image(assets_dir, "folder_icon.png", 18)
+            except Exception as e:
+                print(f"Failed to load images: {e}")
+                self.youtube_logo = self.download_icon = self.search_icon = self.folder_icon = None
         
         # Header frame with logo
         self.header_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -227,6 +248,28 @@ class App(ctk.CTk):
         )
         self.quality_option.grid(row=0, column=1, padx=10, pady=10, sticky="w")
         
+        # Optional clip range
+        self.clip_label = ctk.CTkLabel(self.quality_frame, text="Clip:", text_color=self.get_text_color())
+        self.clip_label.grid(row=0, column=2, padx=10, pady=10)
+        
+        self.start_entry = ctk.CTkEntry(
+            self.quality_frame, 
+            placeholder_text="Start (0:00)", 
+            width=110,
+            text_color=self.get_text_color(),
+            placeholder_text_color="#777777"
+        )
+        self.start_entry.grid(row=0, column=3, padx=(10, 5), pady=10)
+        
+        self.end_entry = ctk.CTkEntry(
+            self.quality_frame, 
+            placeholder_text="End (1:30)", 
+            width=110,
+            text_color=self.get_text_color(),
+            placeholder_text_color="#777777"
+        )
+        self.end_entry.grid(row=0, column=4, padx=(5, 10), pady=10)
+        
         # Progress Frame
         self.progress_frame = ctk.CTkFrame(self)
         self.progress_frame.grid(row=4, column=0, padx=20, pady=10, sticky="ew")
@@ -273,7 +316,8 @@ class App(ctk.CTk):
         text_color = self.get_text_color()
         
         # Update all labels
-        for widget_name in ['title_label', 'url_label', 'quality_label', 'github_link', 'status_text', 'url_entry']:
+        for widget_name in ['title_label', 'url_label', 'quality_label', 'clip_label', 'github_link', 'status_text',
+                            'url_entry', 'start_entry', 'end_entry']:
             if hasattr(self, widget_name):
                 widget = getattr(self, widget_name)
                 widget.configure(text_color=text_color)
@@ -317,6 +361,9 @@ class App(ctk.CTk):
     def download_video(self):
         url = self.url_entry.get().strip()
         quality = self.quality_var.get()
+        # Empty clip fields mean the whole video
+        start_time = self.start_entry.get().strip() or None
+        end_time = self.end_entry.get().strip() or None
         
         if not url:
             messagebox.showerror("Error", "Please enter a YouTube URL")
@@ -329,13 +376,13 @@ class App(ctk.CTk):
         # Run in a separate thread to avoid freezing the UI
         threading.Thread(
             target=self._download_video_thread, 
-            args=(url, quality, self.download_path), 
+            args=(url, quality, self.download_path, start_time, end_time), 
             daemon=True
         ).start()
     
-    def _download_video_thread(self, url, quality, download_path):
+    def _download_video_thread(self, url, quality, download_path, start_time=None, end_time=None):
         try:
-            result = self.downloader.download_video(url, quality, download_path)
+            result = self.downloader.download_video(url, quality, download_path, start_time, end_time)
             if result:
                 self.update_status(f"Download completed: {result}")
                 # Show success message
@@ -0,0 +1,250 @@
+import errno
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Error classes
+RETRYABLE = "retryable"
+NON_RETRYABLE = "non-retryable"
+RATE_LIMITED = "rate-limited"
+
+# HTTP statuses worth retrying; everything else in 4xx is treated as permanent
+RETRYABLE_STATUSES = {408, 500, 502, 503, 504}
+RATE_LIMIT_STATUSES = {429}
+
+# Disk errors that retrying cannot fix
+DISK_ERRNOS = {errno.ENOSPC, errno.EACCES, errno.EROFS, getattr(errno, 'EDQUOT', errno.ENOSPC)}
+
+# Message fragments used when the exception carries no status code
+NON_RETRYABLE_MESSAGES = (
+    "requested format is not available",
+    "video unavailable",
+    "private video",
+    "sign in to confirm your age",
+    "this video has been removed",
+    "unsupported url",
+    "is not a valid url",
+    "cancelled by user",
+    # Local post-processing failures
+    "postprocessing",
+    "ffmpeg",
+    "ffprobe",
+)
+# Throttling that arrives without a 429, e.g. YouTube's
+# "Sign in to confirm you're not a bot"
+RATE_LIMIT_MESSAGES = (
+    "not a bot",
+)
+RETRYABLE_MESSAGES = (
+    "timed out",
+    "connection reset",
+    "connection refused",
+    "connection aborted",
+    "temporary failure in name resolution",
+    "remote end closed connection",
+    "incomplete read",
+)
+
+
+class HostUnavailable(Exception):
+    """Raised instead of retrying when a host won't be usable for longer than max_delay
+
+    The job itself is fine; callers should put it aside and try again after
+    retry_in seconds rather than record it as failed.
+    """
+
+    def __init__(self, message, retry_in):
+        super().__init__(message)
+        self.retry_in = retry_in
+
+
+class ClassifiedError:
+    """Result of classify_error
+
+    host_error is True only for HTTP and network failures, the errors that
+    say something about the host and count towards its circuit breaker.
+    """
+    __slots__ = ('kind', 'status', 'retry_after', 'host_error')
+
+    def __init__(self, kind, status=None, retry_after=None, host_error=False):
+        self.kind = kind
+        self.status = status
+        self.retry_after = retry_after
+        self.host_error = host_error
+
+
+def _error_chain(error):
+    """Yield an exception and everything it wraps"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        # yt-dlp's DownloadError keeps the original exception in exc_info
+        exc_info = getattr(error, 'exc_info', None)
+        wrapped = exc_info[1] if exc_info and len(exc_info) > 1 else None
+        error = wrapped or error.__cause__ or error.__context__
+
+
+def _parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _http_details(error):
+    """Return (status, headers) from yt-dlp or urllib HTTP errors"""
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status', None) or getattr(error, 'code', None)
+    if status is None and response is not None:
+        status = getattr(response, 'status', None)
+    headers = getattr(error, 'headers', None)
+    if headers is None and response is not None:
+        headers = getattr(response, 'headers', None)
+    return (status if isinstance(status, int) else None), headers
+
+
+def classify_error(error):
+    """Decide whether a download error is worth retrying"""
+    for e in _error_chain(error):
+        if isinstance(e, OSError) and e.errno in DISK_ERRNOS:
+            return ClassifiedError(NON_RETRYABLE)
+        status, headers = _http_details(e)
+        if status is not None:
+            retry_after = _parse_retry_after(headers.get('Retry-After')) if headers else None
+            if status in RATE_LIMIT_STATUSES:
+                return ClassifiedError(RATE_LIMITED, status, retry_after, host_error=True)
+            if status in RETRYABLE_STATUSES or status >= 500:
+                return ClassifiedError(RETRYABLE, status, retry_after, host_error=True)
+            if 400 <= status < 500:
+                return ClassifiedError(NON_RETRYABLE, status)
+
+    message = str(error).lower()
+    match = re.search(r'http error (\d{3})', message)
+    if match:
+        status = int(match.group(1))
+        if status in RATE_LIMIT_STATUSES:
+            return ClassifiedError(RATE_LIMITED, status, host_error=True)
+        if status in RETRYABLE_STATUSES or status >= 500:
+            return ClassifiedError(RETRYABLE, status, host_error=True)
+        return ClassifiedError(NON_RETRYABLE, status)
+    if "too many requests" in message:
+        return ClassifiedError(RATE_LIMITED, 429, host_error=True)
+    if any(fragment in message for fragment in RATE_LIMIT_MESSAGES):
+        return ClassifiedError(RATE_LIMITED, host_error=True)
+    if any(fragment in message for fragment in NON_RETRYABLE_MESSAGES):
+        return ClassifiedError(NON_RETRYABLE)
+    if any(fragment in message for fragment in RETRYABLE_MESSAGES):
+        return ClassifiedError(RETRYABLE, host_error=True)
+    # Unknown errors get the benefit of the doubt, bounded by max_attempts,
+    # but they could be local so they don't count against the host
+    return ClassifiedError(RETRYABLE)
+
+
+class CircuitBreaker:
+    """Stops requests to a host after repeated failures
+
+    Closed: requests flow. After `failure_threshold` consecutive failures (or
+    any rate limit) the breaker opens and refuses requests until the cooldown
+    ends. Then one trial request is let through; success closes the breaker,
+    failure opens it again for twice as long, up to `max_cooldown`.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=30.0, max_cooldown=600.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._cooldown = cooldown
+        self._open_until = 0.0
+        self._trial_in_flight = False
+
+    def time_until_allowed(self):
+        """Seconds until a request may be made (0 if allowed now)"""
+        with self._lock:
+            remaining = self._open_until - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if self._open_until and self._trial_in_flight:
+                # Someone else is making the trial request; wait a cooldown for the outcome
+                return self._cooldown
+            if self._open_until:
+                self._trial_in_flight = True
+            return 0.0
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._cooldown = self.base_cooldown
+            self._open_until = 0.0
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give up a trial request whose outcome says nothing about the host"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self, retry_after=None, rate_limited=False):
+        with self._lock:
+            self._failures += 1
+            now = time.monotonic()
+            if self._trial_in_flight:
+                # The trial request failed; back off harder
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+                self._trial_in_flight = False
+                self._open_until = now + self._cooldown
+            elif rate_limited or self._failures >= self.failure_threshold:
+                self._open_until = now + self._cooldown
+            if retry_after:
+                self._open_until = max(self._open_until, now + retry_after)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter plus per-host circuit breakers"""
+
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=60.0,
+                 failure_threshold=5, cooldown=30.0, max_cooldown=600.0, fragment_retries=10):
+        self.max_attempts = max_attempts
+        # In-place retries for a single stream fragment inside one attempt
+        self.fragment_retries = fragment_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt` (1-based)"""
+        if retry_after is not None:
+            # The server told us when to come back; don't come back sooner
+            return retry_after
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    def sleep_function(self, n):
+        """Backoff for yt-dlp's fragment retries (retry_sleep_functions)"""
+        return self.delay(n + 1)
+
+    def breaker_for(self, host):
+        """Return the circuit breaker shared by every job talking to host"""
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.cooldown, self.max_cooldown)
+                self._breakers[host] = breaker
+            return breaker
+
+
+# Shared by every downloader in the process so breakers see all jobs' failures
+DEFAULT_RETRY_POLICY = RetryPolicy()
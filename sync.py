@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import threading
+import yt_dlp
+from downloader import YouTubeDownloader
+from job_store import SQLiteJobStore, QUEUED, RUNNING, FAILED
+from retry_policy import HostUnavailable
+
+DEFAULT_STATE_PATH = os.path.join(os.path.expanduser("~"), ".youtube_downloader", "sync_state.json")
+# How many of the newest processed video IDs to remember per source, so the
+# sync still finds where it stopped after a few of them are deleted
+RECENT_IDS = 20
+
+
+class WatermarkStore:
+    """Remembers the newest video already processed for each channel or playlist"""
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._watermarks = json.load(f)
+        except FileNotFoundError:
+            self._watermarks = {}
+
+    def get(self, source):
+        """Return {'video_id': ..., 'upload_date': ..., 'recent_ids': [...]} or None"""
+        with self._lock:
+            return self._watermarks.get(source)
+
+    def set(self, source, video_id, upload_date=None):
+        with self._lock:
+            state = self._watermarks.setdefault(source, {})
+            # State files written before recent_ids existed only have video_id
+            recent_ids = state.get('recent_ids') or ([state['video_id']] if state.get('video_id') else [])
+            recent_ids = [video_id] + [i for i in recent_ids if i != video_id]
+            state.update(video_id=video_id, upload_date=upload_date, recent_ids=recent_ids[:RECENT_IDS])
+            self._save()
+
+    def jobs(self, source):
+        """Return (pending, failed) for a source
+
+        pending maps video IDs queued into a job store to {'job_id': ..., 'url': ...};
+        failed maps video IDs that failed to download to their URL.
+        """
+        with self._lock:
+            state = self._watermarks.get(source) or {}
+            return dict(state.get('pending') or {}), dict(state.get('failed') or {})
+
+    def set_jobs(self, source, pending, failed):
+        with self._lock:
+            state = self._watermarks.setdefault(source, {})
+            state['pending'] = pending
+            state['failed'] = failed
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Write to a temp file first so a crash never leaves half a state file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._watermarks, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class ChannelSync:
+    """Downloads only the uploads added to a channel or playlist since the last sync
+
+    Entries are enumerated lazily, newest first, and enumeration stops at the
+    stored watermark, so each sync only pages through the new uploads. The
+    last RECENT_IDS processed videos all count as the watermark, so deleting
+    the newest of them doesn't send the sync back through the whole channel. This
+    relies on the source listing newest uploads first, which is the order of
+    a channel's Videos tab. Oldest-first playlists can be synced with
+    reverse=True, but have to be listed in full every time.
+
+    With a job store the watermark advances as soon as a video is queued, as
+    the sync can't wait for workers and waiting would queue in-flight videos
+    again. Instead the queued job IDs are kept and checked on the next sync.
+    Videos that fail, whether downloaded directly or through a job, are
+    recorded as failed and reported, and are only tried again when sync() is
+    called with retry_failed=True.
+    """
+
+    def __init__(self, watermarks=None, downloader=None, status_callback=None):
+        self.watermarks = watermarks or WatermarkStore()
+        self.status_callback = status_callback or print
+        self.downloader = downloader or YouTubeDownloader(status_callback=self.status_callback)
+
+    def new_entries(self, source_url, reverse=False):
+        """Return entries newer than the watermark, newest first"""
+        watermark = self.watermarks.get(source_url)
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+            # Only list the entries; don't resolve every video page
+            'extract_flat': 'in_playlist',
+        }
+        entries = []
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(source_url, download=False, process=False)
+            if not info:
+                return entries
+            # Unprocessed results keep 'entries' as a generator that fetches pages on demand
+            source_entries = info.get('entries') or ()
+            if reverse:
+                # An oldest-first listing has to be read in full before it can be walked backwards
+                source_entries = reversed(list(source_entries))
+            for entry in source_entries:
+                if not entry or not entry.get('id'):
+                    continue
+                if watermark and self._reached_watermark(entry, watermark):
+                    break
+                entries.append({
+                    'id': entry['id'],
+                    'url': entry.get('url') or f"https://www.youtube.com/watch?v={entry['id']}",
+                    'title': entry.get('title'),
+                    'upload_date': entry.get('upload_date'),
+                })
+        return entries
+
+    @staticmethod
+    def _reached_watermark(entry, watermark):
+        if entry['id'] == watermark.get('video_id') or entry['id'] in (watermark.get('recent_ids') or ()):
+            return True
+        # Flat channel listings usually omit upload_date, so this only helps
+        # when every remembered video has been deleted and the listing has dates
+        upload_date = entry.get('upload_date')
+        return bool(upload_date and watermark.get('upload_date') and upload_date <= watermark['upload_date'])
+
+    def sync(self, source_url, quality, download_path, job_store=None, reverse=False, retry_failed=False):
+        """Download (or queue into job_store) every new upload; returns the entries handled"""
+        if job_store is not None:
+            self._settle_jobs(source_url, job_store)
+
+        _, failed = self.watermarks.jobs(source_url)
+        if failed and retry_failed:
+            self.status_callback(f"Retrying {len(failed)} failed video(s) from {source_url}")
+            for video_id, url in failed.items():
+                if not self._process(source_url, video_id, url, quality, download_path, job_store):
+                    return []
+        elif failed:
+            self.status_callback(
+                f"{len(failed)} video(s) from {source_url} failed to download "
+                f"(use --retry-failed to try them again): {', '.join(failed.values())}"
+            )
+
+        entries = self.new_entries(source_url, reverse)
+        if not entries:
+            self.status_callback(f"No new videos in {source_url}")
+            return []
+        self.status_callback(f"Found {len(entries)} new video(s) in {source_url}")
+
+        # Process oldest first so the watermark can advance after each one
+        done = []
+        for entry in reversed(entries):
+            if not self._process(source_url, entry['id'], entry['url'], quality, download_path, job_store):
+                break
+            self.watermarks.set(source_url, entry['id'], entry['upload_date'])
+            done.append(entry)
+        return done
+
+    def _process(self, source_url, video_id, url, quality, download_path, job_store):
+        """Download or queue one video; returns False if the sync should stop
+
+        A video that fails to download is recorded as failed rather than
+        stopping the sync, so one premiere or members-only upload can't hold
+        back every newer video.
+        """
+        pending, failed = self.watermarks.jobs(source_url)
+        if job_store is not None:
+            job_id = job_store.add(url, quality, download_path, source=source_url)
+            pending[video_id] = {'job_id': job_id, 'url': url}
+            failed.pop(video_id, None)
+        else:
+            try:
+                downloaded = self.downloader.download_video(url, quality, download_path)
+            except HostUnavailable as e:
+                # Everything after this video would hit the same wall
+                self.status_callback(f"Stopping sync: {e}")
+                return False
+            if downloaded:
+                failed.pop(video_id, None)
+            else:
+                self.status_callback(f"Failed to download {url}; use --retry-failed to try it again")
+                failed[video_id] = url
+        self.watermarks.set_jobs(source_url, pending, failed)
+        return True
+
+    def _settle_jobs(self, source_url, job_store):
+        """Record the outcome of jobs queued by earlier syncs"""
+        pending, failed = self.watermarks.jobs(source_url)
+        for video_id, job in list(pending.items()):
+            status = job_store.status(job['job_id'])
+            if status in (QUEUED, RUNNING):
+                continue
+            del pending[video_id]
+            if status == FAILED:
+                failed[video_id] = job['url']
+            # Jobs missing from the store (e.g. a new database) can't be tracked any further
+        self.watermarks.set_jobs(source_url, pending, failed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Download new uploads from channels or playlists")
+    parser.add_argument("sources", nargs="+", help="Channel or playlist URLs")
+    parser.add_argument("--quality", default="Highest",
+                        choices=["Highest", "1080p", "720p", "480p", "360p", "Audio Only"])
+    parser.add_argument("--output", default=os.path.join(os.path.expanduser("~"), "Downloads"))
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="Watermark state file")
+    parser.add_argument("--db", help="Queue new videos into this job database instead of downloading")
+    parser.add_argument("--reverse", action="store_true", help="Source lists oldest uploads first")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Download (or with --db, queue) videos that failed in earlier syncs again")
+    args = parser.parse_args()
+
+    job_store = None
+    if args.db:
+        job_store = SQLiteJobStore(args.db)
+
+    channel_sync = ChannelSync(WatermarkStore(args.state))
+    for source in args.sources:
+        channel_sync.sync(source, args.quality, args.output, job_store, args.reverse, args.retry_failed)
+
+
+if __name__ == "__main__":
+    main()
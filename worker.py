@@ -0,0 +1,194 @@
+import argparse
+import os
+import threading
+import time
+from downloader import YouTubeDownloader
+from download_queue import DownloadJob, FIFO, POLICIES
+from job_store import SQLiteJobStore, DEFAULT_LEASE_SECONDS, new_worker_id
+from retry_policy import HostUnavailable
+
+
+class DownloadWorker:
+    """Pulls jobs from a shared job store and runs them with YouTubeDownloader"""
+
+    def __init__(self, store, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 poll_interval=5, status_callback=None):
+        self.store = store
+        self.worker_id = worker_id or new_worker_id()
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.status_callback = status_callback or print
+        self.downloader = YouTubeDownloader(status_callback=self._log)
+        self._stop = threading.Event()
+
+    def _log(self, message):
+        self.status_callback(f"[{self.worker_id}] {message}")
+
+    def stop(self):
+        """Finish the current job and exit the run loop"""
+        self._stop.set()
+
+    def run(self, once=False):
+        """Process jobs until stopped (or until the store is empty when once=True)"""
+        while not self._stop.is_set():
+            job = self.store.claim(self.worker_id, self.lease_seconds)
+            if job is None:
+                if once:
+                    return
+                self._stop.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job):
+        """Download a claimed job while keeping its lease alive"""
+        self._log(f"Claimed job {job.job_id} (attempt {job.attempts}): {job.url}")
+        finished = threading.Event()
+        lease_lost = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, finished, lease_lost), daemon=True)
+        heartbeat.start()
+        throttled = None
+        try:
+            options = dict(job.options)
+            variants = options.pop('variants', None)
+            if variants:
+                outputs = self.downloader.download_variants(job.url, job.download_path, variants)
+                result = "\n".join(outputs.values()) if outputs else None
+            else:
+                result = self.downloader.download_video(job.url, job.quality, job.download_path, **options)
+        except HostUnavailable as e:
+            result = None
+            throttled = e
+        except Exception as e:
+            result = None
+            self._log(f"Job {job.job_id} crashed: {str(e)}")
+        finally:
+            finished.set()
+            heartbeat.join()
+
+        if throttled is not None:
+            # The host is refusing us for a while; the job itself hasn't failed
+            if self.store.release(job.job_id, self.worker_id):
+                self._log(f"Job {job.job_id} returned to the queue: {throttled}")
+            else:
+                self._log(f"Lost the lease on job {job.job_id}; it was not returned to the queue")
+            # Don't claim (and immediately release) more jobs until the host is back
+            self._stop.wait(throttled.retry_in)
+            return
+
+        if lease_lost.is_set():
+            # The job was cancelled because we can't hold it; its lease expiring
+            # hands it to another worker, so don't record a failure
+            self._log(f"Gave up job {job.job_id} after losing its lease")
+            return
+
+        if result:
+            if not self.store.complete(job.job_id, self.worker_id, result):
+                self._log(f"Lost the lease on job {job.job_id}; result not recorded")
+            else:
+                self._log(f"Job {job.job_id} completed: {result}")
+        elif not self.store.fail(job.job_id, self.worker_id, self.downloader.last_status_message or "Download failed"):
+            self._log(f"Lost the lease on job {job.job_id}; failure not recorded")
+        else:
+            self._log(f"Job {job.job_id} failed")
+
+    def _heartbeat(self, job, finished, lease_lost):
+        # Renew well before the lease runs out so one slow write doesn't lose it
+        interval = max(self.lease_seconds / 3, 1)
+        lease_expires = time.monotonic() + self.lease_seconds
+        while not finished.wait(interval):
+            try:
+                renewed = self.store.heartbeat(job.job_id, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                # e.g. "database is locked" on a busy shared volume. The lease is
+                # still ours until it runs out, so keep trying until then
+                if time.monotonic() + interval < lease_expires:
+                    self._log(f"Heartbeat for job {job.job_id} failed, retrying: {str(e)}")
+                    continue
+                self._log(f"Could not renew the lease on job {job.job_id}, cancelling: {str(e)}")
+                lease_lost.set()
+                self.downloader.cancel_download()
+                return
+            if not renewed:
+                # Another worker reclaimed the job; stop downloading it twice
+                self._log(f"Lease on job {job.job_id} lost, cancelling")
+                lease_lost.set()
+                self.downloader.cancel_download()
+                return
+            lease_expires = time.monotonic() + self.lease_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed YouTube download worker")
+    parser.add_argument("--db", required=True, help="Path to the shared SQLite job database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = subparsers.add_parser("add", help="Queue a download")
+    add_parser.add_argument("url")
+    add_parser.add_argument("--quality", default="Highest",
+                            choices=["Highest", "1080p", "720p", "480p", "360p", "Audio Only"])
+    add_parser.add_argument("--output", default=os.path.join(os.path.expanduser("~"), "Downloads"))
+    add_parser.add_argument("--priority", type=float, default=0, help="Lower values run first")
+    add_parser.add_argument("--start", help="Clip start (seconds or HH:MM:SS)")
+    add_parser.add_argument("--end", help="Clip end (seconds or HH:MM:SS)")
+    add_parser.add_argument("--chapter", action="append", dest="chapters",
+                            help="Only download chapters matching this title (repeatable)")
+    add_parser.add_argument("--also", action="append", dest="variants",
+                            choices=["Highest", "1080p", "720p", "480p", "360p", "Audio Only", "Thumbnail", "Subtitles"],
+                            help="Extra output made from the same download (repeatable)")
+
+    run_parser = subparsers.add_parser("run", help="Process queued downloads")
+    run_parser.add_argument("--worker-id")
+    run_parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                            help="Lease length in seconds")
+    run_parser.add_argument("--poll", type=float, default=5, help="Seconds to wait when the queue is empty")
+    run_parser.add_argument("--once", action="store_true", help="Exit when no jobs are left")
+    run_parser.add_argument("--policy", default=FIFO, choices=POLICIES,
+                            help="Order in which this worker claims jobs of equal priority")
+    run_parser.add_argument("--aging", type=float, default=1.0,
+                            help="Shortest First: seconds taken off a job's expected time per second waited")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        store = SQLiteJobStore(args.db, policy=args.policy, aging=args.aging)
+    else:
+        store = SQLiteJobStore(args.db)
+
+    if args.command == "add":
+        if args.variants and (args.start or args.end or args.chapters):
+            parser.error("--also cannot be combined with --start, --end or --chapter")
+        # Size and channel let workers schedule the job by Shortest First or Fair Share
+        downloader = YouTubeDownloader()
+        downloader.get_video_info(args.url)
+        metadata = downloader.video_info
+        if metadata is not None:
+            # Catch requests that can't be met before a worker spends a download on them
+            if args.chapters and not metadata.matching_chapters(args.chapters):
+                parser.error(f"No chapter matches {', '.join(args.chapters)}")
+            for quality in [args.quality] + (args.variants or []):
+                if not metadata.heights or not (quality == "Highest" or quality.endswith('p')):
+                    # Audio, thumbnails and subtitles don't depend on the video heights
+                    continue
+                height = metadata.height_for(quality)
+                if height is None:
+                    print(f"No format at {quality} or below; the best available format will be used")
+                elif quality != "Highest" and height < int(quality[:-1]):
+                    print(f"{quality} is not available; the job will download {height}p")
+        job = DownloadJob(args.url, args.quality, args.output, metadata,
+                          start_time=args.start, end_time=args.end, chapters=args.chapters)
+        options = {key: value for key, value in job.options.items() if value is not None}
+        if args.variants:
+            # The requested quality is one of the outputs
+            options['variants'] = [args.quality] + [v for v in args.variants if v != args.quality]
+        job_id = store.add(args.url, args.quality, args.output, args.priority, options,
+                           job.expected_seconds(), job.source)
+        print(f"Queued job {job_id}")
+    else:
+        worker = DownloadWorker(store, args.worker_id, args.lease, args.poll)
+        try:
+            worker.run(once=args.once)
+        except KeyboardInterrupt:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    main()